@@ -0,0 +1,172 @@
+"""
+Numba-compiled kernels for the gap widening utilities.
+
+The public API lives in gap_widening_utils.py / multi_gap_utils.py; this
+module only holds the scalar kernels that benefit from JIT compilation.
+When numba is not installed the kernels fall back to plain Python, so the
+utilities stay usable (just slower) without it.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to pure Python
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+    prange = range
+
+
+@njit(cache=True)
+def gap_augmentation_expression_jit(lagrange_order, N_nans, delay, delay_number):
+    """
+    Jitted kernel behind gap_widening_utils.gap_augmentation_expression.
+
+    Args:
+        lagrange_order (int): Order of the interpolant.
+        N_nans (int): Number of consecutive NaNs in the telemetry.
+        delay (float): Delay in samples.
+        delay_number (float): Multiplier for the delay.
+
+    Returns:
+        tuple: (extra_widening, total_nans), both ints.
+    """
+    # math.floor keeps D (and everything derived from it) a plain scalar;
+    # np.floor would return a 0-d ndarray and drag every following operation
+    # through ufunc dispatch when running without numba
+    D = math.floor(delay_number * delay)
+    B_1 = 1 + 2 * D - 2 * N_nans
+    B_2 = 2 * D - 1
+
+    if 1 < lagrange_order <= B_1:
+        extra_widening = lagrange_order + N_nans
+    elif lagrange_order <= B_2:
+        extra_widening = (lagrange_order + 1) / 2 + D
+    else:
+        extra_widening = lagrange_order
+
+    return int(extra_widening), int(N_nans + extra_widening)
+
+
+@njit(cache=True)
+def cascade_widening_jit(lagrange_order, initial_nans, delay, delay_numbers):
+    """
+    Jitted kernel behind gap_widening_utils._cascade_widening.
+
+    Args:
+        lagrange_order (int): Order of the interpolant.
+        initial_nans (int): Initial number of NaNs.
+        delay (float): Delay in samples.
+        delay_numbers (np.ndarray): Float array of delay multipliers per stage.
+
+    Returns:
+        tuple: (extra_widening, total_nans), both ints.
+    """
+    nans = initial_nans
+    for stage in range(len(delay_numbers) - 1):
+        _, nans = gap_augmentation_expression_jit(
+            lagrange_order, nans, delay, delay_numbers[stage]
+        )
+    return gap_augmentation_expression_jit(
+        lagrange_order, nans, delay, delay_numbers[-1]
+    )
+
+
+@njit(cache=True)
+def nan_intervals_jit(x):
+    """
+    Find contiguous NaN blocks of an array in a single fused pass.
+
+    Replaces the np.isnan + np.flatnonzero + np.diff/np.split chain, which
+    reads the array (or N-length temporaries derived from it) three times and
+    allocates a bool mask plus an index array; this kernel streams the input
+    once and emits only the block boundaries.
+
+    Args:
+        x (np.ndarray): Float array possibly containing NaNs.
+
+    Returns:
+        tuple: (starts, ends) int64 arrays of inclusive block boundaries.
+    """
+    n = len(x)
+    capacity = 16
+    starts = np.empty(capacity, np.int64)
+    ends = np.empty(capacity, np.int64)
+    count = 0
+    i = 0
+    while i < n:
+        if np.isnan(x[i]):
+            start = i
+            while i < n and np.isnan(x[i]):
+                i += 1
+            if count == capacity:
+                capacity *= 2
+                new_starts = np.empty(capacity, np.int64)
+                new_starts[:count] = starts[:count]
+                starts = new_starts
+                new_ends = np.empty(capacity, np.int64)
+                new_ends[:count] = ends[:count]
+                ends = new_ends
+            starts[count] = start
+            ends[count] = i - 1
+            count += 1
+        else:
+            i += 1
+    return starts[:count].copy(), ends[:count].copy()
+
+
+@njit(cache=True, parallel=True)
+def sum_widenings_X_jit(block_sizes, lagrange_order, delay, generation):
+    """
+    Total NaN count of the TDI X mask, summed over independent NaN blocks.
+
+    Jitted kernel behind multi_gap_utils.approx_total_nans_from_nan_blocks_X;
+    the blocks are independent, so prange spreads them over CPU threads.
+
+    Args:
+        block_sizes (np.ndarray): Int array of NaN block lengths.
+        lagrange_order (int): Order of the interpolant.
+        delay (float): Delay in samples.
+        generation (int): TDI generation (1 or 2).
+
+    Returns:
+        int: Total number of NaNs after widening.
+    """
+    total_nans = 0
+    for i in prange(len(block_sizes)):
+        # Cascade of widening_gap_X1, plus the X2 stage for generation 2
+        _, nans = gap_augmentation_expression_jit(
+            lagrange_order, block_sizes[i], delay, 1.0
+        )
+        _, nans = gap_augmentation_expression_jit(lagrange_order, nans, delay, 1.0)
+        _, nans = gap_augmentation_expression_jit(lagrange_order, nans, delay, 2.0)
+        if generation != 1:
+            _, nans = gap_augmentation_expression_jit(lagrange_order, nans, delay, 4.0)
+        total_nans += nans
+    return total_nans
+
+
+def warm_up():
+    """
+    Compile every jitted kernel on tiny inputs.
+
+    All kernels are decorated with cache=True, so the machine code produced
+    here lands in the on-disk cache: calling this once (e.g. at driver
+    start-up, or in a build step) means later processes only pay the cost of
+    loading the cached binaries instead of a cold JIT per kernel.
+    """
+    tiny_mask = np.array([np.nan, 1.0])
+    nan_intervals_jit(tiny_mask)
+    gap_augmentation_expression_jit(1, 1, 1.0, 1.0)
+    cascade_widening_jit(1, 1, 1.0, np.array([1.0]))
+    sum_widenings_X_jit(np.array([1], dtype=np.int64), 1, 1.0, 2)
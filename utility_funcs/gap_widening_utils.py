@@ -1,6 +1,20 @@
+import copy
+import functools
+
 import numpy as np
 
+from _jit import cascade_widening_jit, gap_augmentation_expression_jit
+
+# Interferometer measurement prefixes masked per MOSA
+_IFO_PREFIXES = ("tmi", "rfi", "rfi_sb", "isi", "isi_sb")
+
+# Delay multipliers of the cascaded widening stages
+_X1_DELAY_NUMBERS = np.array([1.0, 1.0, 2.0])
+_X1_UNFACTORIZED_DELAY_NUMBERS = np.array([1.0, 3.0])
+_X2_UNFACTORIZED_DELAY_NUMBERS = np.array([1.0, 7.0])
 
+
+@functools.lru_cache(maxsize=4096)
 def gap_augmentation_expression(lagrange_order, N_nans, delay, delay_number=1):
     """
     Compute the gap augmentation from telemetry to eta variables.
@@ -16,18 +30,9 @@ def gap_augmentation_expression(lagrange_order, N_nans, delay, delay_number=1):
             extra_widening (int): Amount of widening from interpolation.
             total_nans (int): N_nans plus extra_widening.
     """
-    D = np.floor(delay_number * delay)
-    B_1 = 1 + 2 * D - 2 * N_nans
-    B_2 = 2 * D - 1
-
-    if 1 < lagrange_order <= B_1:
-        extra_widening = lagrange_order + N_nans
-    elif lagrange_order <= B_2:
-        extra_widening = (lagrange_order + 1) / 2 + D
-    else:
-        extra_widening = lagrange_order
-
-    return int(extra_widening), int(N_nans + extra_widening)
+    return gap_augmentation_expression_jit(
+        lagrange_order, int(N_nans), float(delay), float(delay_number)
+    )
 
 
 def _cascade_widening(lagrange_order, initial_nans, delay, delay_numbers):
@@ -38,21 +43,20 @@ def _cascade_widening(lagrange_order, initial_nans, delay, delay_numbers):
         lagrange_order (int): Order of the interpolant.
         initial_nans (int): Initial number of NaNs.
         delay (float): Delay in samples.
-        delay_numbers (list): List of delay multipliers for each stage.
+        delay_numbers (array-like): Delay multipliers for each stage.
 
     Returns:
         tuple: (extra_widening, total_nans)
     """
-    nans = initial_nans
-    for d_num in delay_numbers[:-1]:
-        _, nans = gap_augmentation_expression(
-            lagrange_order, nans, delay, delay_number=d_num
-        )
-    return gap_augmentation_expression(
-        lagrange_order, nans, delay, delay_number=delay_numbers[-1]
+    return cascade_widening_jit(
+        lagrange_order,
+        int(initial_nans),
+        float(delay),
+        np.asarray(delay_numbers, dtype=np.float64),
     )
 
 
+@functools.lru_cache(maxsize=4096)
 def widening_gap_X1(lagrange_order, N_nans, delay):
     """
     Compute gap augmentation from eta to X1 variables (factorized).
@@ -65,9 +69,10 @@ def widening_gap_X1(lagrange_order, N_nans, delay):
     Returns:
         tuple: (extra_widening, total_nans)
     """
-    return _cascade_widening(lagrange_order, N_nans, delay, [1, 1, 2])
+    return _cascade_widening(lagrange_order, N_nans, delay, _X1_DELAY_NUMBERS)
 
 
+@functools.lru_cache(maxsize=4096)
 def widening_gap_X2(order, N_nans, delay):
     """
     Compute gap augmentation from X1 to X2 variables (fully factorized).
@@ -84,6 +89,7 @@ def widening_gap_X2(order, N_nans, delay):
     return gap_augmentation_expression(order, total_nans_X1, delay, delay_number=4.0)
 
 
+@functools.lru_cache(maxsize=4096)
 def widening_gap_X1_unfactorized(lagrange_order, N_nans, delay):
     """
     Compute gap augmentation from eta to X1 variables (unfactorized).
@@ -96,9 +102,10 @@ def widening_gap_X1_unfactorized(lagrange_order, N_nans, delay):
     Returns:
         tuple: (extra_widening, total_nans)
     """
-    return _cascade_widening(lagrange_order, N_nans, delay, [1, 3])
+    return _cascade_widening(lagrange_order, N_nans, delay, _X1_UNFACTORIZED_DELAY_NUMBERS)
 
 
+@functools.lru_cache(maxsize=4096)
 def widening_gap_X2_unfactorized(lagrange_order, N_nans, delay):
     """
     Compute gap augmentation from eta to X2 variables (unfactorized).
@@ -111,7 +118,7 @@ def widening_gap_X2_unfactorized(lagrange_order, N_nans, delay):
     Returns:
         tuple: (extra_widening, total_nans)
     """
-    return _cascade_widening(lagrange_order, N_nans, delay, [1, 7])
+    return _cascade_widening(lagrange_order, N_nans, delay, _X2_UNFACTORIZED_DELAY_NUMBERS)
 
 
 def construct_mask_single_gap(N_nans, length=None):
@@ -129,3 +136,66 @@ def construct_mask_single_gap(N_nans, length=None):
     mid_index = int(len(masking_function) / 2)
     masking_function[mid_index : mid_index + N_nans] = np.nan
     return masking_function
+
+
+def nan_indices_from_mask(masking_function):
+    """
+    Extract the indices of the NaN entries of a masking function.
+
+    Args:
+        masking_function (np.ndarray): Array of 1s and NaNs.
+
+    Returns:
+        np.ndarray: Indices of the NaN entries.
+    """
+    return np.flatnonzero(np.isnan(masking_function))
+
+
+def nanify_telemetry_variables(data, masking_function):
+    """
+    Apply a masking function (with NaNs) to telemetry variables, pseudo-ranges, and their derivatives.
+
+    Args:
+        data (object): Telemetry object with .measurements, .delays and
+            .delay_derivatives attributes (dict-like, keyed by MOSA).
+        masking_function (np.ndarray): Array of 1s and NaNs to apply as a mask.
+
+    Returns:
+        object: Telemetry object with masked measurements, pseudo-ranges and
+            pseudo-range derivatives. The input data is left untouched.
+    """
+    MOSAS = data.MOSAS
+
+    # Shallow copy of the container: every masked field below gets a freshly
+    # allocated array, so the original data is never modified. A deepcopy
+    # would duplicate all of the telemetry arrays only to overwrite them.
+    data_w_gaps = copy.copy(data)
+    data_w_gaps.measurements = dict(data.measurements)
+    data_w_gaps.delays = dict(data.delays)
+    data_w_gaps.delay_derivatives = dict(data.delay_derivatives)
+
+    # Gaps cover a tiny fraction of the series, so multiplying every sample
+    # by 1.0 is wasted bandwidth: copy each field and write NaNs only at the
+    # gap indices, computed once from the mask.
+    nan_indices = nan_indices_from_mask(masking_function)
+
+    # Apply mask to all telemetry fields. Stacking the five measurements of a
+    # MOSA writes the NaNs of all five fields in a single fancy-indexed store.
+    for mosa in MOSAS:
+        labels = [f"{prefix}_{mosa}" for prefix in _IFO_PREFIXES]
+        stack = np.stack([data.measurements[label] for label in labels])
+        stack[:, nan_indices] = np.nan
+        for row, label in enumerate(labels):
+            data_w_gaps.measurements[label] = stack[row]
+
+    # Mask pseudo-ranges and their derivatives
+    for delay_craft in data.delays:
+        mpr = data.delays[delay_craft].copy()
+        mpr[nan_indices] = np.nan
+        data_w_gaps.delays[delay_craft] = mpr
+
+        mpr_derivative = data.delay_derivatives[delay_craft].copy()
+        mpr_derivative[nan_indices] = np.nan
+        data_w_gaps.delay_derivatives[delay_craft] = mpr_derivative
+
+    return data_w_gaps
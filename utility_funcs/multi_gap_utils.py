@@ -1,5 +1,6 @@
 import numpy as np
 
+from _jit import nan_intervals_jit, sum_widenings_X_jit
 from gap_widening_utils import (
     gap_augmentation_expression,
     widening_gap_X1,
@@ -20,17 +21,34 @@ def merge_intervals(intervals):
     if not intervals:
         return []
 
+    if len(intervals) <= 64:
+        # For few gaps the ndarray round trip costs more than it saves.
+        # Tuples sort lexicographically by start, so no key callback is
+        # needed.
+        intervals = sorted(intervals)
+        merged = [intervals[0]]
+        for current in intervals[1:]:
+            prev = merged[-1]
+            if current[0] <= prev[1] + 1:  # Overlapping or adjacent
+                merged[-1] = (prev[0], max(prev[1], current[1]))
+            else:
+                merged.append(current)
+        return merged
+
     # Sort by start of interval
-    intervals.sort(key=lambda x: x[0])
-    merged = [intervals[0]]
+    interval_array = np.asarray(intervals, dtype=np.int64)
+    interval_array = interval_array[np.argsort(interval_array[:, 0], kind="stable")]
+
+    # A merged group ends where the next start exceeds the running maximum
+    # end by more than 1 (overlapping or adjacent intervals share a group)
+    running_max_end = np.maximum.accumulate(interval_array[:, 1])
+    new_group = np.empty(len(interval_array), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = interval_array[1:, 0] > running_max_end[:-1] + 1
 
-    for current in intervals[1:]:
-        prev = merged[-1]
-        if current[0] <= prev[1] + 1:  # Overlapping or adjacent
-            merged[-1] = (prev[0], max(prev[1], current[1]))
-        else:
-            merged.append(current)
-    return merged
+    starts = interval_array[new_group, 0]
+    ends = np.maximum.reduceat(interval_array[:, 1], np.flatnonzero(new_group))
+    return list(zip(starts.tolist(), ends.tolist()))
 
 
 def nans_blocks_function(object_w_nans):
@@ -43,12 +61,68 @@ def nans_blocks_function(object_w_nans):
     Returns:
         list of np.ndarray: List of arrays, each containing indices of a contiguous NaN block.
     """
-    nan_indices = np.argwhere(np.isnan(object_w_nans)).flatten()
+    nan_indices = np.flatnonzero(np.isnan(object_w_nans))
     if nan_indices.size == 0:
-        return np.array([], dtype=int)
+        return []
     return np.split(nan_indices, np.where(np.diff(nan_indices) > 1)[0] + 1)
 
 
+def intervals_from_mask(object_w_nans):
+    """
+    Extract contiguous NaN blocks of an array as (start, end) intervals.
+
+    Args:
+        object_w_nans (np.ndarray): Array possibly containing NaNs.
+
+    Returns:
+        list of tuple: Inclusive (start, end) index pairs, one per NaN block.
+    """
+    starts, ends = nan_intervals_jit(np.asarray(object_w_nans))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def intervals_to_mask(intervals, length, dtype=float):
+    """
+    Rasterize (start, end) intervals into a mask of ones with NaN gaps.
+
+    Args:
+        intervals (list of tuple): Inclusive (start, end) index pairs.
+        length (int): Total length of the mask array.
+        dtype (dtype, optional): Float dtype of the mask (default float64).
+
+    Returns:
+        np.ndarray: Mask of ones with NaNs over the given intervals.
+    """
+    mask = np.ones(length, dtype=dtype)
+    for start, end in intervals:
+        start = max(start, 0)
+        end = min(end, length - 1)
+        if start <= end:
+            mask[start : end + 1] = np.nan
+    return mask
+
+
+def _widen_intervals(intervals, delay, p):
+    """
+    Widen NaN intervals by the direct and delayed interpolation contributions.
+
+    Args:
+        intervals (list of tuple): Inclusive (start, end) index pairs.
+        delay (int): Delay in samples.
+        p (int): Half-width of the interpolant, (order + 1) // 2.
+
+    Returns:
+        list of tuple: Merged widened intervals.
+    """
+    affected_intervals = []
+    for start, end in intervals:
+        # Direct NaNs
+        affected_intervals.append((start, end))
+        # Delayed NaNs (inclusive)
+        affected_intervals.append((start + delay - p + 1, end + delay - (1 - p) + 1))
+    return merge_intervals(affected_intervals)
+
+
 def approx_total_nans_from_nan_blocks_eta(
     object_w_nans, delay, lagrange_order=45, delay_number=1.0
 ):
@@ -63,11 +137,10 @@ def approx_total_nans_from_nan_blocks_eta(
     Returns:
         int: Total number of NaNs after widening.
     """
-    nan_blocks = nans_blocks_function(object_w_nans)
+    starts, ends = nan_intervals_jit(np.asarray(object_w_nans))
     total_nans = 0
 
-    for block in nan_blocks:
-        block_size = len(block)
+    for block_size in (ends - starts + 1):
         _, total_nans_block = gap_augmentation_expression(
             lagrange_order, block_size, delay, delay_number
         )
@@ -88,18 +161,12 @@ def approx_total_nans_from_nan_blocks_X(object_w_nans, delay, order=45, generati
     Returns:
         int: Total number of NaNs after widening.
     """
-    nan_blocks = nans_blocks_function(object_w_nans)
-    total_nans = 0
-
-    for block in nan_blocks:
-        block_size = len(block)
-        if generation == 1:
-            _, total_nans_block = widening_gap_X1(order, block_size, delay)
-        else:
-            _, total_nans_block = widening_gap_X2(order, block_size, delay)
-        total_nans += total_nans_block
+    starts, ends = nan_intervals_jit(np.asarray(object_w_nans))
+    block_sizes = ends - starts + 1
 
-    return int(total_nans)
+    # The blocks are independent, so the widening cascade runs over them in
+    # parallel inside the jitted kernel
+    return int(sum_widenings_X_jit(block_sizes, order, float(delay), generation))
 
 
 def compute_nan_indices_delay(object_w_nans, delay, order=45):
@@ -114,45 +181,13 @@ def compute_nan_indices_delay(object_w_nans, delay, order=45):
     Returns:
         np.ndarray: Array with NaNs at affected indices.
     """
-    N_original_series = len(object_w_nans)
-    nan_blocks = nans_blocks_function(object_w_nans)
-    affected_intervals = []
     p = int((order + 1) / 2)
-
-    for block in nan_blocks:
-        n_object_first = block[0]
-        n_object_last = block[-1]
-
-        # Direct NaNs
-        direct_start = n_object_first
-        direct_end = n_object_last
-
-        # Delayed NaNs (inclusive)
-        delay_start = n_object_first + delay - p + 1
-        delay_end = n_object_last + delay - (1 - p) + 1
-
-        affected_intervals.append((direct_start, direct_end))
-        affected_intervals.append((delay_start, delay_end))
-
-    merged_intervals = merge_intervals(affected_intervals)
-
-    affected_indices = np.concatenate(
-        [np.arange(start, end + 1) for start, end in merged_intervals]
+    merged_intervals = _widen_intervals(intervals_from_mask(object_w_nans), delay, p)
+    # Inherit the input dtype: a float32 series gets a float32 mask, halving
+    # the bandwidth of the rasterize and of downstream broadcasts
+    return intervals_to_mask(
+        merged_intervals, len(object_w_nans), dtype=np.asarray(object_w_nans).dtype
     )
-    affected_indices = affected_indices[
-        (affected_indices >= 0) & (affected_indices < N_original_series)
-    ]
-
-    # Merge the gaps if we need
-    affected_indices = np.unique(affected_indices)
-
-    # Create a vector of ones
-    new_mask_like_array = np.ones_like(object_w_nans, dtype=float)
-
-    # Force the indices representing nans to actually be nans
-    new_mask_like_array[affected_indices] = np.nan
-
-    return new_mask_like_array
 
 
 def mask_eta(mask_telemetry, delay, order):
@@ -173,7 +208,9 @@ def mask_eta(mask_telemetry, delay, order):
     return new_mask_like_array_eta
 
 
-def mask_TDI_X(mask_telemetry, delay, order=45, generation=2):
+def mask_TDI_X(
+    mask_telemetry, delay, order=45, generation=2, mask_eta_precomputed=None
+):
     """
     Generate a mask for TDI X variables (generation 1 or 2) given a telemetry mask.
 
@@ -181,24 +218,38 @@ def mask_TDI_X(mask_telemetry, delay, order=45, generation=2):
         mask_telemetry (np.ndarray): Telemetry mask (with NaNs).
         order (int): Order of the interpolant.
         generation (int): TDI generation (1 or 2).
+        mask_eta_precomputed (np.ndarray, optional): Output of mask_eta for
+            the same telemetry mask, delay and order. If given, the eta
+            stage is skipped instead of being recomputed.
 
     Returns:
         np.ndarray: TDI X mask (with NaNs).
     """
-    new_mask_like_array_eta = compute_nan_indices_delay(
-        mask_telemetry, delay=int(np.floor(delay)), order=order
-    )
-    new_mask_like_array_a12 = compute_nan_indices_delay(
-        new_mask_like_array_eta, delay=int(np.floor(delay)), order=order
-    )
-    new_mask_like_array_r12 = compute_nan_indices_delay(
-        new_mask_like_array_a12, delay=int(np.floor(2 * delay)), order=order
+    p = int((order + 1) / 2)
+    stage_delays = (
+        int(np.floor(delay)),  # eta
+        int(np.floor(delay)),  # a12
+        int(np.floor(2 * delay)),  # r12
+        int(np.floor(4 * delay)),  # q21
     )
-
     if generation == 1:
-        return new_mask_like_array_r12
+        stage_delays = stage_delays[:3]
+
+    # Drivers that already called mask_eta can hand its result in rather
+    # than paying for the eta stage a second time
+    if mask_eta_precomputed is not None:
+        intervals = intervals_from_mask(mask_eta_precomputed)
+        stage_delays = stage_delays[1:]
     else:
-        new_mask_like_array_q21 = compute_nan_indices_delay(
-            new_mask_like_array_r12, delay=int(np.floor(4 * delay)), order=order
-        )
-        return new_mask_like_array_q21
+        intervals = intervals_from_mask(mask_telemetry)
+
+    # Each stage only widens existing NaN blocks, so carry the block
+    # boundaries between stages as interval lists instead of re-scanning an
+    # N-length mask with np.isnan at every stage; the mask is rasterized once
+    # at the end.
+    for stage_delay in stage_delays:
+        intervals = _widen_intervals(intervals, stage_delay, p)
+
+    return intervals_to_mask(
+        intervals, len(mask_telemetry), dtype=np.asarray(mask_telemetry).dtype
+    )